@@ -3,7 +3,7 @@
 """
 import os
 import datetime
-import re
+import string
 import pandas as pd
 import logging
 from typing import List
@@ -51,6 +51,31 @@ underlyingMapping = {
     }
 }
 
+# BUY_TO_COVER and SELL_SHORT are not supported, so they are mapped to BUY and SELL
+actionMapping = {
+    broker.Order.Action.BUY_TO_COVER: broker.Order.Action.BUY,
+    broker.Order.Action.BUY: broker.Order.Action.BUY,
+    broker.Order.Action.SELL_SHORT: broker.Order.Action.SELL,
+    broker.Order.Action.SELL: broker.Order.Action.SELL
+}
+
+# Live broker order constructors keyed by order class, called with (action, instrument, quantity, price, stopPrice, traits)
+orderBuilders = {
+    broker.MarketOrder: lambda action, instrument, quantity, price, stopPrice, traits:
+        broker.MarketOrder(action, instrument, quantity, False, traits),
+    broker.LimitOrder: lambda action, instrument, quantity, price, stopPrice, traits:
+        broker.LimitOrder(action, instrument, price, quantity, traits),
+    broker.StopOrder: lambda action, instrument, quantity, price, stopPrice, traits:
+        broker.StopOrder(action, instrument, stopPrice, quantity, traits),
+    broker.StopLimitOrder: lambda action, instrument, quantity, price, stopPrice, traits:
+        broker.StopLimitOrder(action, instrument, stopPrice, price, quantity, traits)
+}
+
+monthNumbers = {
+    'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4, 'MAY': 5, 'JUN': 6,
+    'JUL': 7, 'AUG': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12
+}
+
 
 def getUnderlyingMappings():
     return underlyingMapping
@@ -64,11 +89,36 @@ def getOptionSymbol(underlyingInstrument, expiry, strikePrice, callOrPut):
     return f'{underlyingInstrument}{expiry.strftime("%d%b%y").upper()}{callOrPut.upper()}{strikePrice}'
 
 
+# Characters allowed in the underlying part of an option symbol, '|' is only valid in the dated form
+optionUnderlyingCharacters = frozenset(string.ascii_uppercase + '|')
+
+
+def getFirstDigitIndex(symbol):
+    for index, character in enumerate(symbol):
+        if character.isdigit():
+            return index
+    return -1
+
+
+def parseDatedOptionSymbol(symbol, rest, underlying):
+    # <underlying><DD><MMM><YY><C|P><strike>, rest is the symbol from its first digit on
+    if len(rest) > 8 and rest[7] in 'CP' and rest[0:2].isdigit() and rest[5:7].isdigit() and rest[8:].isdigit():
+        month = monthNumbers.get(rest[2:5])
+        if month is not None:
+            expiry = datetime.date(int(rest[5:7]) + 2000, month, int(rest[0:2]))
+            return OptionContract(symbol, int(rest[8:]), expiry, "c" if rest[7] == "C" else "p", underlying)
+    return None
+
+
 class QuantityTraits(broker.InstrumentTraits):
     def roundQuantity(self, quantity):
         return round(quantity, 2)
 
 
+# QuantityTraits holds no state, so every instrument shares this instance
+quantityTraits = QuantityTraits()
+
+
 class BacktestingBroker(backtesting.Broker):
     """A Finvasia backtesting broker.
 
@@ -102,22 +152,33 @@ class BacktestingBroker(backtesting.Broker):
         return underlyingInstrument + str(ceStrikePrice) + "CE", underlyingInstrument + str(peStrikePrice) + "PE"
 
     def getOptionContract(self, symbol):
-        m = re.match(r"([A-Z\|]+)(\d{2})([A-Z]{3})(\d{2})([CP])(\d+)", symbol)
+        start = getFirstDigitIndex(symbol)
+        if start <= 0:
+            return None
 
-        if m is not None:
-            day = int(m.group(2))
-            month = m.group(3)
-            year = int(m.group(4)) + 2000
-            expiry = datetime.date(
-                year, datetime.datetime.strptime(month, '%b').month, day)
-            return OptionContract(symbol, int(m.group(6)), expiry, "c" if m.group(5) == "C" else "p", m.group(1))
+        underlying = symbol[:start]
+        if not optionUnderlyingCharacters.issuperset(underlying):
+            return None
+
+        rest = symbol[start:]
+
+        optionContract = parseDatedOptionSymbol(symbol, rest, underlying)
+        if optionContract is not None:
+            return optionContract
+
+        # <underlying><strike><CE|PE>
+        if '|' in underlying:
+            return None
 
-        m = re.match(r"([A-Z]+)(\d+)(CE|PE)", symbol)
+        end = start
+        while end < len(symbol) and symbol[end].isdigit():
+            end += 1
 
-        if m is None:
+        optionType = symbol[end:end + 2]
+        if optionType not in ('CE', 'PE'):
             return None
 
-        return OptionContract(symbol, int(m.group(2)), None, "c" if m.group(3) == "CE" else "p", m.group(1))
+        return OptionContract(symbol, int(symbol[start:end]), None, "c" if optionType == "CE" else "p", underlying)
 
     def getHistoricalData(self, exchangeSymbol: str, startTime: datetime.datetime, interval: str) -> pd.DataFrame():
         return pd.DataFrame(columns=['Date/Time', 'Open', 'High', 'Low', 'Close', 'Volume', 'Open Interest'])
@@ -128,7 +189,7 @@ class BacktestingBroker(backtesting.Broker):
         self.setFillStrategy(fillstrategy.DefaultStrategy(volumeLimit=None))
 
     def getInstrumentTraits(self, instrument):
-        return QuantityTraits()
+        return quantityTraits
 
     def submitOrder(self, order):
         if order.isInitial():
@@ -138,12 +199,7 @@ class BacktestingBroker(backtesting.Broker):
         return super(BacktestingBroker, self).submitOrder(order)
 
     def _remapAction(self, action):
-        action = {
-            broker.Order.Action.BUY_TO_COVER: broker.Order.Action.BUY,
-            broker.Order.Action.BUY: broker.Order.Action.BUY,
-            broker.Order.Action.SELL_SHORT: broker.Order.Action.SELL,
-            broker.Order.Action.SELL: broker.Order.Action.SELL
-        }.get(action, None)
+        action = actionMapping.get(action, None)
         if action is None:
             raise Exception("Only BUY/SELL orders are supported")
         return action
@@ -4,6 +4,7 @@
 
 import os
 import datetime
+import json
 import requests
 import logging
 from io import BytesIO, StringIO
@@ -12,14 +13,64 @@ import pandas as pd
 from functools import lru_cache
 from concurrent.futures import ThreadPoolExecutor
 import pyotp
+from requests.adapters import HTTPAdapter
+import NorenRestApiPy.NorenApi as norenApiModule
 from NorenRestApiPy.NorenApi import NorenApi as ShoonyaApi
 from pyalgomate.brokers import getDefaultUnderlyings, getExpiryDates
 from pyalgomate.brokers.finvasia.broker import getOptionSymbols, getUnderlyingDetails
 from pyalgomate.brokers.finvasia.feed import LiveTradeFeed
 import pyalgomate.utils as utils
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger()
 
+
+class OrjsonModule(object):
+    # Stands in for the json module inside NorenApi so REST responses are decoded with orjson. Only NorenApi's
+    # reference is replaced, the stdlib json module is left untouched.
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def __getattr__(self, name):
+        return getattr(json, name)
+
+
+# orjson is optional, without it NorenApi keeps using the stdlib json module
+if orjson is not None and getattr(norenApiModule, 'json', None) is json:
+    norenApiModule.json = OrjsonModule()
+
+
+class SessionRequestsModule(object):
+    # Stands in for the requests module inside NorenApi so every REST call goes through one pooled session and
+    # reuses its TCP/TLS connections. The pool is sized for the concurrent basket order workers.
+    def __init__(self, poolSize=32):
+        self.__session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=poolSize, pool_maxsize=poolSize, max_retries=0)
+        self.__session.mount('https://', adapter)
+        self.__session.mount('http://', adapter)
+
+    def request(self, *args, **kwargs):
+        return self.__session.request(*args, **kwargs)
+
+    def get(self, *args, **kwargs):
+        return self.__session.get(*args, **kwargs)
+
+    def post(self, *args, **kwargs):
+        return self.__session.post(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+if getattr(norenApiModule, 'requests', None) is requests:
+    norenApiModule.requests = SessionRequestsModule()
+
 urls = [
     "https://api.shoonya.com/NSE_symbols.txt.zip",
     "https://api.shoonya.com/NFO_symbols.txt.zip",
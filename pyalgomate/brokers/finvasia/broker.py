@@ -6,16 +6,18 @@ import threading
 import time
 import logging
 import datetime
-import six
 import calendar
-import re
+import collections
+import weakref
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import ForwardRef, List, Dict
 
 from pyalgotrade import broker
 from pyalgotrade.broker import Order
 from pyalgomate.barfeed import BaseBarFeed
-from pyalgomate.brokers import BacktestingBroker, QuantityTraits
+from pyalgomate.brokers import BacktestingBroker, quantityTraits, actionMapping, orderBuilders, getFirstDigitIndex, monthNumbers, parseDatedOptionSymbol
 from pyalgomate.strategies import OptionContract
 from NorenRestApiPy.NorenApi import NorenApi
 from pyalgomate.utils import UnderlyingIndex
@@ -63,29 +65,40 @@ underlyingMapping = {
     }
 }
 
+optionPrefixMapping = {underlyingDetails['optionPrefix']: underlying for underlying, underlyingDetails in underlyingMapping.items()}
+
+monthAbbreviations = tuple(calendar.month_abbr[month].upper() for month in range(13))
+
+# Month codes used by BSE weekly option symbols
+weeklyMonthCodes = {str(month): month for month in range(1, 10)}
+weeklyMonthCodes.update({'O': 10, 'N': 11, 'D': 12})
+
+# BSE options use a different symbol format than the NSE ones
+bseUnderlyingIndexes = (UnderlyingIndex.SENSEX, UnderlyingIndex.BANKEX)
+
 def getUnderlyingMappings():
     return underlyingMapping
 
 def getUnderlyingDetails(underlying):
     return underlyingMapping[underlying]
 
+# Strategies look up the same few symbols on every bar. typed=True keeps 100 and 100.0 apart since
+# they format differently.
+@lru_cache(maxsize=4096, typed=True)
 def getOptionSymbol(underlyingInstrument, expiry, strikePrice, callOrPut):
     underlyingDetails = getUnderlyingDetails(underlyingInstrument)
     optionPrefix = underlyingDetails['optionPrefix']
     index = underlyingDetails['index']
 
-    if index not in [UnderlyingIndex.SENSEX, UnderlyingIndex.BANKEX]:
-        dayMonthYear = f"{expiry.day:02d}" + \
-            calendar.month_abbr[expiry.month].upper() + str(expiry.year % 100)
-        return optionPrefix + dayMonthYear + callOrPut + str(strikePrice)
+    if index not in bseUnderlyingIndexes:
+        return f"{optionPrefix}{expiry.day:02d}{monthAbbreviations[expiry.month]}{expiry.year % 100}{callOrPut}{strikePrice}"
     else:
-        strikePlusOption = str(strikePrice) + ('CE' if (callOrPut ==
-                                                        'C' or callOrPut == 'Call') else 'PE')
+        strikePlusOption = f"{strikePrice}{'CE' if callOrPut in ('C', 'Call') else 'PE'}"
 
         monthly = utils.getNearestMonthlyExpiryDate(expiry, index) == expiry
 
         if monthly:
-            return optionPrefix + str(expiry.year % 100) + calendar.month_abbr[expiry.month].upper() + strikePlusOption
+            return f"{optionPrefix}{expiry.year % 100}{monthAbbreviations[expiry.month]}{strikePlusOption}"
         else:
             if expiry.month == 10:
                 monthlySymbol = 'O'
@@ -95,24 +108,67 @@ def getOptionSymbol(underlyingInstrument, expiry, strikePrice, callOrPut):
                 monthlySymbol = 'D'
             else:
                 monthlySymbol = f'{expiry.month}'
-            return optionPrefix + str(expiry.year % 100) + f"{monthlySymbol}{expiry.day:02d}" + strikePlusOption
+            return f"{optionPrefix}{expiry.year % 100}{monthlySymbol}{expiry.day:02d}{strikePlusOption}"
 
 
 def getOptionSymbols(underlyingInstrument, expiry, ltp, count, strikeDifference=100):
     ltp = int(float(ltp) / strikeDifference) * strikeDifference
     logger.info(f"Nearest strike price of {underlyingInstrument} is <{ltp}>")
-    optionSymbols = []
-    for n in range(-count, count+1):
-       optionSymbols.append(getOptionSymbol(
-           underlyingInstrument, expiry, ltp + (n * strikeDifference), 'C'))
+    strikes = [ltp + (n * strikeDifference) for n in range(-count, count+1)]
+    underlyingDetails = getUnderlyingDetails(underlyingInstrument)
 
-    for n in range(-count, count+1):
-       optionSymbols.append(getOptionSymbol(
-           underlyingInstrument, expiry, ltp - (n * strikeDifference), 'P'))
+    if underlyingDetails['index'] not in bseUnderlyingIndexes:
+        # The expiry part of the symbol is the same for every strike
+        prefix = f"{underlyingDetails['optionPrefix']}{expiry.day:02d}{monthAbbreviations[expiry.month]}{expiry.year % 100}"
+        optionSymbols = [f'{prefix}C{strike}' for strike in strikes] + \
+            [f'{prefix}P{strike}' for strike in reversed(strikes)]
+    else:
+        optionSymbols = [getOptionSymbol(underlyingInstrument, expiry, strike, 'C') for strike in strikes] + \
+            [getOptionSymbol(underlyingInstrument, expiry, strike, 'P') for strike in reversed(strikes)]
 
     logger.info("Options symbols are " + ",".join(optionSymbols))
     return optionSymbols
 
+def getOptionContract(symbol) -> OptionContract:
+    start = getFirstDigitIndex(symbol)
+    if start <= 0:
+        return None
+
+    underlying = optionPrefixMapping.get(symbol[:start])
+    if underlying is None:
+        return None
+
+    rest = symbol[start:]
+
+    # <prefix><DD><MMM><YY><C|P><strike>
+    optionContract = parseDatedOptionSymbol(symbol, rest, underlying)
+    if optionContract is not None:
+        return optionContract
+
+    optionType = rest[-2:]
+    if len(rest) < 6 or optionType not in ('CE', 'PE') or not rest[0:2].isdigit():
+        return None
+
+    year = int(rest[0:2]) + 2000
+    strike = rest[5:-2]
+    if not strike.isdigit():
+        return None
+
+    # <prefix><YY><MMM><strike><CE|PE>
+    month = monthNumbers.get(rest[2:5])
+    if month is not None:
+        expiry = utils.getNearestMonthlyExpiryDate(
+            datetime.date(year, month, 1), underlyingMapping[underlying]['index'])
+        return OptionContract(symbol, int(strike), expiry, "c" if optionType == "CE" else "p", underlying)
+
+    # <prefix><YY><M><DD><strike><CE|PE>
+    month = weeklyMonthCodes.get(rest[2])
+    if month is None or not rest[3:5].isdigit():
+        return None
+
+    expiry = datetime.date(year, month, int(rest[3:5]))
+    return OptionContract(symbol, int(strike), expiry, "c" if optionType == "CE" else "p", underlying)
+
 def getHistoricalData(api: NorenApi, exchangeSymbol: str, startTime: datetime.datetime, interval: str) -> pd.DataFrame:
     startTime = startTime.replace(hour=0, minute=0, second=0, microsecond=0)
     splitStrings = exchangeSymbol.split('|')
@@ -140,14 +196,34 @@ def getHistoricalData(api: NorenApi, exchangeSymbol: str, startTime: datetime.da
     else:
         return pd.DataFrame(columns=['Date/Time', 'Open', 'High', 'Low', 'Close', 'Volume', 'Open Interest'])
 
+@lru_cache(maxsize=1024)
+def parseOrderDateTime(dateTime: str) -> datetime.datetime:
+    # Order book timestamps repeat on every poll, so the parsed value is cached
+    if len(dateTime) != 19:
+        return datetime.datetime.strptime(dateTime, '%H:%M:%S %d-%m-%Y')
+
+    # HH:MM:SS DD-MM-YYYY
+    return datetime.datetime(int(dateTime[15:19]), int(dateTime[12:14]), int(dateTime[9:11]),
+                             int(dateTime[0:2]), int(dateTime[3:5]), int(dateTime[6:8]))
+
+priceTypeMapping = {
+    # LMT / MKT / SL-LMT / SL-MKT / DS / 2L / 3L
+    broker.Order.Type.MARKET: 'MKT',
+    broker.Order.Type.LIMIT: 'LMT',
+    broker.Order.Type.STOP_LIMIT: 'SL-LMT',
+    broker.Order.Type.STOP: 'SL-MKT'
+}
+
+# Order types that carry a limit price
+limitPriceOrderTypes = (broker.Order.Type.LIMIT, broker.Order.Type.STOP_LIMIT)
+
 def getPriceType(orderType):
-    return {
-                # LMT / MKT / SL-LMT / SL-MKT / DS / 2L / 3L
-                broker.Order.Type.MARKET: 'MKT',
-                broker.Order.Type.LIMIT: 'LMT',
-                broker.Order.Type.STOP_LIMIT: 'SL-LMT',
-                broker.Order.Type.STOP: 'SL-MKT'
-            }.get(orderType)
+    return priceTypeMapping.get(orderType)
+
+def getExchangeAndSymbol(instrument):
+    exchange, separator, symbol = instrument.partition('|')
+    return (exchange, symbol) if separator else ('NSE', instrument)
+
 class PaperTradingBroker(BacktestingBroker):
     """A Finvasia paper trading broker.
     """    
@@ -171,64 +247,14 @@ class PaperTradingBroker(BacktestingBroker):
     def getOptionSymbol(self, underlyingInstrument, expiry, strikePrice, callOrPut):
         symbol = getUnderlyingDetails(underlyingInstrument)['optionPrefix']
 
-        dayMonthYear = f"{expiry.day:02d}" + \
-            calendar.month_abbr[expiry.month].upper() + str(expiry.year % 100)
-        return symbol + dayMonthYear + ('C' if (callOrPut == 'C' or callOrPut == 'Call') else 'P') + str(strikePrice)
+        optionType = 'C' if callOrPut in ('C', 'Call') else 'P'
+        return f"{symbol}{expiry.day:02d}{monthAbbreviations[expiry.month]}{expiry.year % 100}{optionType}{strikePrice}"
 
     def getOptionSymbols(self, underlyingInstrument, expiry, ceStrikePrice, peStrikePrice):
         return getOptionSymbol(underlyingInstrument, expiry, ceStrikePrice, 'C'), getOptionSymbol(underlyingInstrument, expiry, peStrikePrice, 'P')
 
     def getOptionContract(self, symbol) -> OptionContract:
-        m = re.match(r"([A-Z\|]+)(\d{2})([A-Z]{3})(\d{2})([CP])(\d+)", symbol)
-
-        if m is None:
-            m = re.match(r"([A-Z\|]+)(\d{2})([A-Z]{3})(\d+)([CP])E", symbol)
-
-            if m is not None:
-                optionPrefix = m.group(1)
-                for underlying, underlyingDetails in underlyingMapping.items():
-                    if underlyingDetails['optionPrefix'] == optionPrefix:
-                        index = self.getUnderlyingDetails(underlying)['index']
-                        month = datetime.datetime.strptime(m.group(3), '%b').month
-                        year = int(m.group(2)) + 2000
-                        expiry = utils.getNearestMonthlyExpiryDate(
-                            datetime.date(year, month, 1), index)
-                        return OptionContract(symbol, int(m.group(4)), expiry, "c" if m.group(5) == "C" else "p", underlying)
-
-            m = re.match(r"([A-Z\|]+)(\d{2})(\d|[OND])(\d{2})(\d+)([CP])E", symbol)
-
-            if m is None:
-                return None
-
-            day = int(m.group(4))
-            month = m.group(3)
-            if month == 'O':
-                month = 10
-            elif month == 'N':
-                month = 11
-            elif month == 'D':
-                month = 12
-            else:
-                month = int(month)
-
-            year = int(m.group(2)) + 2000
-            expiry = datetime.date(year, month, day)
-            optionPrefix = m.group(1)
-            for underlying, underlyingDetails in underlyingMapping.items():
-                if underlyingDetails['optionPrefix'] == optionPrefix:
-                    return OptionContract(symbol, int(m.group(5)), expiry, "c" if m.group(6) == "C" else "p", underlying)
-
-        day = int(m.group(2))
-        month = m.group(3)
-        year = int(m.group(4)) + 2000
-        expiry = datetime.date(
-            year, datetime.datetime.strptime(month, '%b').month, day)
-
-        optionPrefix = m.group(1)
-
-        for underlying, underlyingDetails in underlyingMapping.items():
-            if underlyingDetails['optionPrefix'] == optionPrefix:
-                return OptionContract(symbol, int(m.group(6)), expiry, "c" if m.group(5) == "C" else "p", underlying)
+        return getOptionContract(symbol)
 
     pass
 
@@ -324,38 +350,52 @@ class PaperTradingBroker(BacktestingBroker):
 
 
 class OrderEvent(object):
+    __slots__ = ('__stat', '__errorMessage', '__id', '__status', '__rejectedReason',
+                 '__avgFilledPrice', '__totalFilledQuantity', '__dateTime')
+
     def __init__(self, eventDict):
-        self.__eventDict = eventDict
+        # Parse the event once, the getters are called several times per trade
+        self.__stat = eventDict.get('state', None)
+        self.__errorMessage = eventDict.get('emsg', None)
+        self.__id = eventDict.get('norenordno', None)
+        self.__status = eventDict.get('status', None)
+        self.__rejectedReason = eventDict.get('rejreason', None)
+        self.__avgFilledPrice = float(eventDict.get('avgprc', 0.0))
+        self.__totalFilledQuantity = float(eventDict.get('fillshares', 0.0))
+        self.__dateTime = parseOrderDateTime(eventDict['norentm']) if eventDict.get('norentm', None) is not None else None
 
     def getStat(self):
-        return self.__eventDict.get('state', None)
+        return self.__stat
     
     def getErrorMessage(self):
-        return self.__eventDict.get('emsg', None)
+        return self.__errorMessage
 
     def getId(self):
-        return self.__eventDict.get('norenordno', None)
+        return self.__id
 
     def getStatus(self):
-        return self.__eventDict.get('status', None)
+        return self.__status
 
     def getRejectedReason(self):
-        return self.__eventDict.get('rejreason', None)
+        return self.__rejectedReason
 
     def getAvgFilledPrice(self):
-        return float(self.__eventDict.get('avgprc', 0.0))
+        return self.__avgFilledPrice
 
     def getTotalFilledQuantity(self):
-        return float(self.__eventDict.get('fillshares', 0.0))
+        return self.__totalFilledQuantity
 
     def getDateTime(self):
-        return datetime.datetime.strptime(self.__eventDict['norentm'], '%H:%M:%S %d-%m-%Y') if self.__eventDict.get('norentm', None) is not None else None
+        return self.__dateTime
 
 LiveBroker = ForwardRef('LiveBroker')
 
 class TradeMonitor(threading.Thread):
     POLL_FREQUENCY = 1
 
+    # Shoonya sends several order updates per transition, a woken poll waits this long so they share one order book call
+    COALESCE_WINDOW = 0.2
+
     RETRY_COUNT = 3
 
     RETRY_INTERVAL = 5
@@ -366,24 +406,32 @@ class TradeMonitor(threading.Thread):
         super(TradeMonitor, self).__init__()
         self.__api: NorenApi = liveBroker.getApi()
         self.__broker: LiveBroker = liveBroker
-        self.__queue = six.moves.queue.Queue()
-        self.__stop = False
+        self.__queue = collections.deque()
+        self.__queueEvent = threading.Event()
+        self.__stopEvent = threading.Event()
         self.__retryData = dict()
+        # Set when the websocket pushes an order update so the next poll runs right away
+        self.__wakeEvent = threading.Event()
 
     def getNewTrades(self):
         ret: List[OrderEvent] = []
-        activeOrders: List[Order] = [order for order in self.__broker.getActiveOrders().copy()]
+        activeOrders: List[Order] = self.__broker.getActiveOrders()
+        if len(activeOrders) == 0:
+            return ret
+
         orderBook = self.__api.get_order_book()
+        pollTime = time.time()
+        orderBookById = {orderBookOrder.get('norenordno'): orderBookOrder for orderBookOrder in orderBook}
         for order in activeOrders:
-            filteredOrders = [orderBookOrder for orderBookOrder in orderBook if orderBookOrder.get('norenordno') == order.getId()]
-            if len(filteredOrders) == 0:
+            orderBookOrder = orderBookById.get(order.getId())
+            if orderBookOrder is None:
                 logger.warning(f'Order not found in the order book for order id {order.getId()}')
                 continue
 
-            orderEvent = OrderEvent(filteredOrders[0])
+            orderEvent = OrderEvent(orderBookOrder)
 
             if order not in self.__retryData:
-                self.__retryData[order] = {'retryCount': 0, 'lastRetryTime': time.time()}
+                self.__retryData[order] = {'retryCount': 0, 'lastRetryTime': pollTime}
 
             if orderEvent.getStat() == 'Not_Ok':
                 logger.error(f'Fetching order history for {orderEvent.getId()} failed with reason {orderEvent.getErrorMessage()}')
@@ -394,7 +442,7 @@ class TradeMonitor(threading.Thread):
                 retryCount = self.__retryData[order]['retryCount']
                 lastRetryTime = self.__retryData[order]['lastRetryTime']
 
-                if time.time() < (lastRetryTime + TradeMonitor.RETRY_INTERVAL):
+                if pollTime < (lastRetryTime + TradeMonitor.RETRY_INTERVAL):
                     continue
 
                 # Modify the order based on current LTP for retry 0 and convert to market for retry one
@@ -423,9 +471,13 @@ class TradeMonitor(threading.Thread):
                 lastRetryTime = self.__retryData[order]['lastRetryTime']
 
                 if retryCount < TradeMonitor.RETRY_COUNT:
-                    if time.time() > (lastRetryTime + TradeMonitor.RETRY_INTERVAL):
+                    if pollTime > (lastRetryTime + TradeMonitor.RETRY_INTERVAL):
                         logger.warning(f'Order {order.getId()} {orderEvent.getStatus()} with reason {orderEvent.getRejectedReason()}. Retrying attempt {self.__retryData[order]["retryCount"] + 1}')
-                        self.__broker.placeOrder(order)
+                        try:
+                            self.__broker.placeOrder(order)
+                        except Exception:
+                            # Already logged by placeOrder, the attempt still counts towards RETRY_COUNT
+                            pass
                         self.__retryData[order]['retryCount'] += 1
                         self.__retryData[order]['lastRetryTime'] = time.time()
                 else:
@@ -439,35 +491,68 @@ class TradeMonitor(threading.Thread):
                 logger.error(f'Unknown trade status {orderEvent.getStatus()}')
 
         # Sort by time, so older trades first.
-        return sorted(ret, key=lambda t: t.getDateTime())
+        ret.sort(key=OrderEvent.getDateTime)
+        return ret
 
     def getQueue(self):
         return self.__queue
 
+    def getEvent(self, timeout):
+        """Returns the next (eventType, eventData) tuple, waiting up to timeout seconds. Returns None if there is none."""
+        # Clear before checking so an append racing with the check still wakes the wait below
+        self.__queueEvent.clear()
+        if not self.__queue:
+            self.__queueEvent.wait(timeout)
+
+        try:
+            return self.__queue.popleft()
+        except IndexError:
+            return None
+
+    def __putEvent(self, eventType, eventData):
+        self.__queue.append((eventType, eventData))
+        self.__queueEvent.set()
+
+    def onOrderUpdate(self, message):
+        self.__wakeEvent.set()
+
     def start(self):
+        # Only the Finvasia live feed pushes order updates, with any other feed the monitor just polls
+        getOrderUpdateEvent = getattr(self.__broker.getFeed(), 'getOrderUpdateEvent', None)
+        if getOrderUpdateEvent is not None:
+            getOrderUpdateEvent().subscribe(self.onOrderUpdate)
+
         trades = self.getNewTrades()
         if len(trades):
             logger.info(
                 f'Last trade found at {trades[-1].getDateTime()}. Order id {trades[-1].getId()}')
-            self.__queue.put((TradeMonitor.ON_USER_TRADE, trades))
+            self.__putEvent(TradeMonitor.ON_USER_TRADE, trades)
 
         super(TradeMonitor, self).start()
 
     def run(self):
-        while not self.__stop:
+        while not self.__stopEvent.is_set():
+            self.__wakeEvent.clear()
+            # stop() may have landed between the loop check and the clear, its wake would be lost
+            if self.__stopEvent.is_set():
+                break
             try:
                 trades = self.getNewTrades()
                 if len(trades):
                     logger.info(f'{len(trades)} new trade/s found')
-                    self.__queue.put((TradeMonitor.ON_USER_TRADE, trades))
+                    self.__putEvent(TradeMonitor.ON_USER_TRADE, trades)
             except Exception as e:
                 logger.critical(
                     "Error retrieving user transactions", exc_info=e)
 
-            time.sleep(TradeMonitor.POLL_FREQUENCY)
+            # Order updates pushed over the websocket cut the wait short, polling remains the fallback
+            if self.__wakeEvent.wait(TradeMonitor.POLL_FREQUENCY):
+                self.__stopEvent.wait(TradeMonitor.COALESCE_WINDOW)
 
     def stop(self):
-        self.__stop = True
+        self.__stopEvent.set()
+        # Wake the poll wait so the thread exits without sitting out POLL_FREQUENCY
+        self.__wakeEvent.set()
 
 
 class OrderResponse(object):
@@ -476,6 +561,8 @@ class OrderResponse(object):
     # Sample Success Response: { "request_time": "14:14:10 26-05-2020", "stat": "Ok", "result":"20052600000103" }
     # Sample Error Response : { "stat": "Not_Ok", "request_time": "20:40:01 19-05-2020", "emsg": "Error Occurred : 2 "invalid input"" }
 
+    __slots__ = ('__dict',)
+
     def __init__(self, response):
         self.__dict: dict = response
 
@@ -483,7 +570,7 @@ class OrderResponse(object):
         return self.__dict.get('norenordno', self.__dict.get('result', None))
 
     def getDateTime(self):
-        return datetime.datetime.strptime(self.__dict["request_time"], "%H:%M:%S %d-%m-%Y")
+        return parseOrderDateTime(self.__dict["request_time"])
 
     def getStat(self):
         return self.__dict.get("stat", None)
@@ -492,6 +579,77 @@ class OrderResponse(object):
         return self.__dict.get("emsg", None)
 
 
+class AccountBalanceRefresher(threading.Thread):
+    # Refresh requests arriving within this many seconds share a single get_limits call
+    COALESCE_WINDOW = 0.2
+
+    def __init__(self, liveBroker: LiveBroker):
+        super(AccountBalanceRefresher, self).__init__()
+        self.__broker: LiveBroker = liveBroker
+        self.__refreshEvent = threading.Event()
+        self.__stopEvent = threading.Event()
+
+    def requestRefresh(self):
+        self.__refreshEvent.set()
+
+    def run(self):
+        while not self.__stopEvent.is_set():
+            self.__refreshEvent.wait()
+            if self.__stopEvent.is_set():
+                break
+
+            self.__stopEvent.wait(AccountBalanceRefresher.COALESCE_WINDOW)
+            # Cleared before refreshing so a request made during the refresh triggers another one
+            self.__refreshEvent.clear()
+            try:
+                self.__broker.refreshAccountBalance()
+            except Exception as e:
+                logger.critical(
+                    "Error refreshing account balance", exc_info=e)
+
+    def stop(self):
+        self.__stopEvent.set()
+        self.__refreshEvent.set()
+
+
+class ActiveOrderTable(object):
+    """Active orders keyed by their Finvasia order id.
+
+    The strategy, the trade monitor and the basket placement workers all use the table, so changes and
+    check-then-act sequences go through a single lock. The lock is reentrant so callers can hold it
+    around several table operations.
+    """
+
+    def __init__(self):
+        self.__orders: Dict[str, Order] = dict()
+        self.__lock = threading.RLock()
+
+    def getLock(self):
+        return self.__lock
+
+    def add(self, order: Order):
+        orderId = order.getId()
+        with self.__lock:
+            assert (orderId is not None)
+            assert (orderId not in self.__orders)
+            self.__orders[orderId] = order
+
+    def remove(self, order: Order):
+        orderId = order.getId()
+        with self.__lock:
+            assert (orderId is not None)
+            assert (orderId in self.__orders)
+            del self.__orders[orderId]
+
+    def get(self, orderId):
+        # A single dict lookup is atomic, callers that act on the result take the lock themselves
+        return self.__orders.get(orderId)
+
+    def values(self):
+        with self.__lock:
+            return list(self.__orders.values())
+
+
 class LiveBroker(broker.Broker):
     """A Finvasia live broker.
     
@@ -514,6 +672,9 @@ class LiveBroker(broker.Broker):
     """
 
     QUEUE_TIMEOUT = 0.01
+    # Baskets are placed this many orders at a time, with a pause between batches to stay inside the API rate limit
+    ORDER_BATCH_SIZE = 10
+    ORDER_BATCH_INTERVAL = 1.0
 
     def getType(self):
         return "Live"
@@ -527,64 +688,14 @@ class LiveBroker(broker.Broker):
     def getOptionSymbol(self, underlyingInstrument, expiry, strikePrice, callOrPut):
         symbol = getUnderlyingDetails(underlyingInstrument)['optionPrefix']
 
-        dayMonthYear = f"{expiry.day:02d}" + \
-            calendar.month_abbr[expiry.month].upper() + str(expiry.year % 100)
-        return symbol + dayMonthYear + ('C' if (callOrPut == 'C' or callOrPut == 'Call') else 'P') + str(strikePrice)
+        optionType = 'C' if callOrPut in ('C', 'Call') else 'P'
+        return f"{symbol}{expiry.day:02d}{monthAbbreviations[expiry.month]}{expiry.year % 100}{optionType}{strikePrice}"
 
     def getOptionSymbols(self, underlyingInstrument, expiry, ceStrikePrice, peStrikePrice):
         return getOptionSymbol(underlyingInstrument, expiry, ceStrikePrice, 'C'), getOptionSymbol(underlyingInstrument, expiry, peStrikePrice, 'P')
 
     def getOptionContract(self, symbol) -> OptionContract:
-        m = re.match(r"([A-Z\|]+)(\d{2})([A-Z]{3})(\d{2})([CP])(\d+)", symbol)
-
-        if m is None:
-            m = re.match(r"([A-Z\|]+)(\d{2})([A-Z]{3})(\d+)([CP])E", symbol)
-
-            if m is not None:
-                optionPrefix = m.group(1)
-                for underlying, underlyingDetails in underlyingMapping.items():
-                    if underlyingDetails['optionPrefix'] == optionPrefix:
-                        index = self.getUnderlyingDetails(underlying)['index']
-                        month = datetime.datetime.strptime(m.group(3), '%b').month
-                        year = int(m.group(2)) + 2000
-                        expiry = utils.getNearestMonthlyExpiryDate(
-                            datetime.date(year, month, 1), index)
-                        return OptionContract(symbol, int(m.group(4)), expiry, "c" if m.group(5) == "C" else "p", underlying)
-
-            m = re.match(r"([A-Z\|]+)(\d{2})(\d|[OND])(\d{2})(\d+)([CP])E", symbol)
-
-            if m is None:
-                return None
-
-            day = int(m.group(4))
-            month = m.group(3)
-            if month == 'O':
-                month = 10
-            elif month == 'N':
-                month = 11
-            elif month == 'D':
-                month = 12
-            else:
-                month = int(month)
-
-            year = int(m.group(2)) + 2000
-            expiry = datetime.date(year, month, day)
-            optionPrefix = m.group(1)
-            for underlying, underlyingDetails in underlyingMapping.items():
-                if underlyingDetails['optionPrefix'] == optionPrefix:
-                    return OptionContract(symbol, int(m.group(5)), expiry, "c" if m.group(6) == "C" else "p", underlying)
-
-        day = int(m.group(2))
-        month = m.group(3)
-        year = int(m.group(4)) + 2000
-        expiry = datetime.date(
-            year, datetime.datetime.strptime(month, '%b').month, day)
-
-        optionPrefix = m.group(1)
-
-        for underlying, underlyingDetails in underlyingMapping.items():
-            if underlyingDetails['optionPrefix'] == optionPrefix:
-                return OptionContract(symbol, int(m.group(6)), expiry, "c" if m.group(5) == "C" else "p", underlying)
+        return getOptionContract(symbol)
 
     def getHistoricalData(self, exchangeSymbol: str, startTime: datetime.datetime, interval: str) -> pd.DataFrame():
         return getHistoricalData(self.__api, exchangeSymbol, startTime, interval)
@@ -595,9 +706,21 @@ class LiveBroker(broker.Broker):
         self.__api: NorenApi = api
         self.__barFeed: BaseBarFeed = barFeed
         self.__tradeMonitor = TradeMonitor(self)
+        self.__balanceRefresher = AccountBalanceRefresher(self)
         self.__cash = 0
         self.__shares = {}
-        self.__activeOrders: Dict[str, Order] = dict()
+        self.__activeOrders = ActiveOrderTable()
+        # Orders waiting to be switched from SUBMITTED to ACCEPTED by dispatch
+        self.__submittedOrders: collections.deque = collections.deque()
+        # (order, reason) for orders that could not be placed, canceled by dispatch
+        self.__failedOrders: collections.deque = collections.deque()
+        # Cancels are sent from here so the caller does not wait on the round trip. The trade monitor reports
+        # the CANCELED state once the order book reflects it.
+        self.__cancelExecutor = ThreadPoolExecutor(max_workers=4)
+        # Serializes placing, modifying and cancelling of the same order. Keyed by the order object since Finvasia
+        # gives an order a new id whenever it is modified or placed again.
+        self.__orderLocks = weakref.WeakKeyDictionary()
+        self.__orderLocksLock = threading.Lock()
 
     def getApi(self):
         return self.__api
@@ -616,17 +739,48 @@ class LiveBroker(broker.Broker):
         return ret
 
     def getInstrumentTraits(self, instrument):
-        return QuantityTraits()
+        return quantityTraits
+
+    def _getOrderLock(self, order: Order):
+        with self.__orderLocksLock:
+            lock = self.__orderLocks.get(order)
+            if lock is None:
+                lock = threading.RLock()
+                self.__orderLocks[order] = lock
+            return lock
 
     def _registerOrder(self, order: Order):
-        assert (order.getId() not in self.__activeOrders)
-        assert (order.getId() is not None)
-        self.__activeOrders[order.getId()] = order
+        self.__activeOrders.add(order)
 
     def _unregisterOrder(self, order: Order):
-        assert (order.getId() in self.__activeOrders)
-        assert (order.getId() is not None)
-        del self.__activeOrders[order.getId()]
+        self.__activeOrders.remove(order)
+
+    def _markSubmitted(self, order: Order, orderId, submitDateTime):
+        # Re-keying the order and switching its state is one step under the table lock, so other threads never
+        # see it registered under a stale id or half way through submission. Returns the previous order id.
+        with self.__activeOrders.getLock():
+            oldOrderId = order.getId()
+            if oldOrderId is not None:
+                self._unregisterOrder(order)
+
+            order.setSubmitted(orderId, submitDateTime)
+            self._registerOrder(order)
+
+            if order.isInitial():
+                # Switch from INITIAL -> SUBMITTED
+                # IMPORTANT: Do not emit an event for this switch because when using the position interface
+                # the order is not yet mapped to the position and Position.onOrderUpdated will get called.
+                order.switchState(broker.Order.State.SUBMITTED)
+                self.__submittedOrders.append(order)
+
+        return oldOrderId
+
+    def _markFailed(self, order: Order, reason):
+        # Switch from INITIAL -> SUBMITTED now and leave the switch to CANCELED to dispatch. The position maps the
+        # order only after submitOrder returns, and it expects a submitted order to still be active.
+        with self.__activeOrders.getLock():
+            order.switchState(broker.Order.State.SUBMITTED)
+            self.__failedOrders.append((order, reason))
 
     def refreshAccountBalance(self):
         try:
@@ -648,6 +802,10 @@ class LiveBroker(broker.Broker):
             logger.exception(
                 f'Exception retrieving account balance. Reason: {limits["emsg"]}')
 
+    def requestAccountBalanceRefresh(self):
+        # Refreshes the balance in the background, use refreshAccountBalance when a fresh value is needed right away
+        self.__balanceRefresher.requestRefresh()
+
     def refreshOpenOrders(self):
         return
         self.__stop = True  # Stop running in case of errors.
@@ -668,17 +826,19 @@ class LiveBroker(broker.Broker):
 
     def _onTrade(self, order: Order, trade: OrderEvent):
         if trade.getStatus() == 'REJECTED' or trade.getStatus() == 'CANCELED':
-            self._unregisterOrder(order)
-            order.switchState(broker.Order.State.CANCELED)
+            with self.__activeOrders.getLock():
+                self._unregisterOrder(order)
+                order.switchState(broker.Order.State.CANCELED)
             self.notifyOrderEvent(broker.OrderEvent(
                 order, broker.OrderEvent.Type.CANCELED, None))
         elif trade.getStatus() == 'COMPLETE':
             fee = 0
             orderExecutionInfo = broker.OrderExecutionInfo(
                 trade.getAvgFilledPrice(), trade.getTotalFilledQuantity() - order.getFilled(), fee, trade.getDateTime())
-            order.addExecutionInfo(orderExecutionInfo)
-            if not order.isActive():
-                self._unregisterOrder(order)
+            with self.__activeOrders.getLock():
+                order.addExecutionInfo(orderExecutionInfo)
+                if not order.isActive():
+                    self._unregisterOrder(order)
             # Notify that the order was updated.
             if order.isFilled():
                 eventType = broker.OrderEvent.Type.FILLED
@@ -690,7 +850,7 @@ class LiveBroker(broker.Broker):
         else:
             logger.error(f'Unknown order status {trade.getStatus()}')
 
-        self.refreshAccountBalance()
+        self.requestAccountBalanceRefresh()
 
     def _onUserTrades(self, trades):
         for trade in trades:
@@ -706,41 +866,52 @@ class LiveBroker(broker.Broker):
         super(LiveBroker, self).start()
         self.refreshAccountBalance()
         self.refreshOpenOrders()
+        self.__balanceRefresher.start()
         self._startTradeMonitor()
 
     def stop(self):
         self.__stop = True
         logger.info("Shutting down trade monitor.")
         self.__tradeMonitor.stop()
+        self.__balanceRefresher.stop()
 
     def join(self):
         self.__tradeMonitor.stop()
         self.__tradeMonitor.join()
+        self.__balanceRefresher.stop()
+        self.__balanceRefresher.join()
+        self.__cancelExecutor.shutdown(wait=True)
 
     def eof(self):
         return self.__stop
 
     def dispatch(self):
+        # Cancel orders that could not be placed.
+        while self.__failedOrders:
+            order, reason = self.__failedOrders.popleft()
+            with self.__activeOrders.getLock():
+                order.switchState(broker.Order.State.CANCELED)
+            self.notifyOrderEvent(broker.OrderEvent(
+                order, broker.OrderEvent.Type.CANCELED, reason))
+
         # Switch orders from SUBMITTED to ACCEPTED.
-        ordersToProcess = list(self.__activeOrders.values())
-        for order in ordersToProcess:
-            if order.isSubmitted():
+        while self.__submittedOrders:
+            order: Order = self.__submittedOrders.popleft()
+            if order.isSubmitted() and self.__activeOrders.get(order.getId()) is order:
                 order.switchState(broker.Order.State.ACCEPTED)
                 self.notifyOrderEvent(broker.OrderEvent(
                     order, broker.OrderEvent.Type.ACCEPTED, None))
 
         # Dispatch events from the trade monitor.
-        try:
-            eventType, eventData = self.__tradeMonitor.getQueue().get(
-                True, LiveBroker.QUEUE_TIMEOUT)
+        event = self.__tradeMonitor.getEvent(LiveBroker.QUEUE_TIMEOUT)
+        if event is not None:
+            eventType, eventData = event
 
             if eventType == TradeMonitor.ON_USER_TRADE:
                 self._onUserTrades(eventData)
             else:
                 logger.error(
                     "Invalid event received to dispatch: %s - %s" % (eventType, eventData))
-        except six.moves.queue.Empty:
-            pass
 
     def peekDateTime(self):
         # Return None since this is a realtime subject.
@@ -763,7 +934,7 @@ class LiveBroker(broker.Broker):
         return self.__activeOrders.get(orderId)
 
     def getActiveOrders(self, instrument=None):
-        return list(self.__activeOrders.values())
+        return self.__activeOrders.values()
 
     # Place a Limit order as follows
 #     api.place_order(buy_or_sell='B', product_type='C',
@@ -799,128 +970,152 @@ class LiveBroker(broker.Broker):
 #     api.cancel_order(orderno=orderno)
 
     def modifyOrder(self, order: Order, newprice_type=None, newprice=0.0):
-        try:
-            splitStrings = order.getInstrument().split('|')
-            exchange = splitStrings[0] if len(splitStrings) > 1 else 'NSE'
-            symbol = splitStrings[1] if len(
-                splitStrings) > 1 else order.getInstrument()
-            quantity = order.getQuantity()
-
-            modifyOrderResponse = self.__api.modify_order(orderno=order.getId(),
-                                                    exchange=exchange,
-                                                    tradingsymbol=symbol,
-                                                    newquantity=quantity,
-                                                    newprice_type=newprice_type,
-                                                    newprice=newprice,
-                                                    newtrigger_price=None,
-                                                    bookloss_price = 0.0,
-                                                    bookprofit_price = 0.0,
-                                                    trail_price = 0.0)
-
-            if modifyOrderResponse is None:
-                raise Exception('modify_order returned None')
-
-            ret = OrderResponse(modifyOrderResponse)
-
-            if ret.getStat() != "Ok":
-                raise Exception(ret.getErrorMessage())
-            
-            oldOrderId = order.getId()
-            if oldOrderId is not None:
-                self._unregisterOrder(order)
+        with self._getOrderLock(order):
+            try:
+                exchange, symbol = getExchangeAndSymbol(order.getInstrument())
+                quantity = order.getQuantity()
+
+                modifyOrderResponse = self.__api.modify_order(orderno=order.getId(),
+                                                        exchange=exchange,
+                                                        tradingsymbol=symbol,
+                                                        newquantity=quantity,
+                                                        newprice_type=newprice_type,
+                                                        newprice=newprice,
+                                                        newtrigger_price=None,
+                                                        bookloss_price = 0.0,
+                                                        bookprofit_price = 0.0,
+                                                        trail_price = 0.0)
+
+                if modifyOrderResponse is None:
+                    raise Exception('modify_order returned None')
+
+                ret = OrderResponse(modifyOrderResponse)
+
+                if ret.getStat() != "Ok":
+                    raise Exception(ret.getErrorMessage())
             
-            order.setSubmitted(ret.getId(),
-                                ret.getDateTime())
-            self._registerOrder(order)
+                orderId = ret.getId()
+                submitDateTime = ret.getDateTime()
+                oldOrderId = self._markSubmitted(order, orderId, submitDateTime)
 
-            logger.info(
-                f'Modified {newprice_type} {"Buy" if order.isBuy() else "Sell"} Order {oldOrderId} with New order {order.getId()} at {order.getSubmitDateTime()}')
-        except Exception as e:
-            logger.critical(f'Could not place order for {symbol}. Reason: {e}')
+                logger.info(
+                    f'Modified {newprice_type} {"Buy" if order.isBuy() else "Sell"} Order {oldOrderId} with New order {orderId} at {submitDateTime}')
+            except Exception as e:
+                logger.critical(f'Could not place order for {symbol}. Reason: {e}')
 
     def placeOrder(self, order: Order):
-        try:
-            buyOrSell = 'B' if order.isBuy() else 'S'
-            splitStrings = order.getInstrument().split('|')
-            exchange = splitStrings[0] if len(splitStrings) > 1 else 'NSE'
-            # "C" For CNC, "M" FOR NRML, "I" FOR MIS, "B" FOR BRACKET ORDER, "H" FOR COVER ORDER
-            productType = 'I' if exchange != 'BFO' else 'M'
-            symbol = splitStrings[1] if len(
-                splitStrings) > 1 else order.getInstrument()
-            quantity = order.getQuantity()
-            price = order.getLimitPrice() if order.getType() in [
-                broker.Order.Type.LIMIT, broker.Order.Type.STOP_LIMIT] else 0
-            stopPrice = order.getStopPrice() if order.getType() in [
-                broker.Order.Type.STOP_LIMIT] else 0
-            priceType = getPriceType(order.getType())
-            retention = 'DAY'  # DAY / EOS / IOC
+        with self._getOrderLock(order):
+            try:
+                isBuy = order.isBuy()
+                buyOrSell = 'B' if isBuy else 'S'
+                exchange, symbol = getExchangeAndSymbol(order.getInstrument())
+                # "C" For CNC, "M" FOR NRML, "I" FOR MIS, "B" FOR BRACKET ORDER, "H" FOR COVER ORDER
+                productType = 'I' if exchange != 'BFO' else 'M'
+                quantity = order.getQuantity()
+                orderType = order.getType()
+                price = order.getLimitPrice() if orderType in limitPriceOrderTypes else 0
+                stopPrice = order.getStopPrice() if orderType == broker.Order.Type.STOP_LIMIT else 0
+                priceType = getPriceType(orderType)
+                retention = 'DAY'  # DAY / EOS / IOC
 
-            logger.info(
-                f'Placing order with buyOrSell={buyOrSell}, product_type={productType}, exchange={exchange}, '
-                f'tradingsymbol={symbol}, quantity={quantity}, discloseqty=0, price_type={priceType}, '
-                f'price={price}, trigger_price={stopPrice}, retention={retention}, remarks="PyAlgoMate order"')
-            placedOrderResponse = self.__api.place_order(buy_or_sell=buyOrSell, product_type=productType,
-                                                    exchange=exchange, tradingsymbol=symbol,
-                                                    quantity=quantity, discloseqty=0, price_type=priceType,
-                                                    price=price, trigger_price=stopPrice,
-                                                    retention=retention, remarks=f'PyAlgoMate order')
-
-            if placedOrderResponse is None:
-                raise Exception('place_order returned None')
-
-            orderResponse = OrderResponse(placedOrderResponse)
-
-            if orderResponse.getStat() != "Ok":
-                raise Exception(orderResponse.getErrorMessage())
-            
-            oldOrderId = order.getId()
-            if oldOrderId is not None:
-                self._unregisterOrder(order)
+                logger.info(
+                    'Placing order with buyOrSell=%s, product_type=%s, exchange=%s, '
+                    'tradingsymbol=%s, quantity=%s, discloseqty=0, price_type=%s, '
+                    'price=%s, trigger_price=%s, retention=%s, remarks="PyAlgoMate order"',
+                    buyOrSell, productType, exchange, symbol, quantity, priceType, price, stopPrice, retention)
+                placedOrderResponse = self.__api.place_order(buy_or_sell=buyOrSell, product_type=productType,
+                                                        exchange=exchange, tradingsymbol=symbol,
+                                                        quantity=quantity, discloseqty=0, price_type=priceType,
+                                                        price=price, trigger_price=stopPrice,
+                                                        retention=retention, remarks='PyAlgoMate order')
+
+                if placedOrderResponse is None:
+                    raise Exception('place_order returned None')
+
+                orderResponse = OrderResponse(placedOrderResponse)
+
+                if orderResponse.getStat() != "Ok":
+                    raise Exception(orderResponse.getErrorMessage())
             
-            order.setSubmitted(orderResponse.getId(),
-                                orderResponse.getDateTime())
+                orderId = orderResponse.getId()
+                submitDateTime = orderResponse.getDateTime()
+                oldOrderId = self._markSubmitted(order, orderId, submitDateTime)
 
-            self._registerOrder(order)
+                logger.info('Placed %s %s Order %s New order %s at %s',
+                            priceType, 'Buy' if isBuy else 'Sell', oldOrderId, orderId, submitDateTime)
+            except Exception as e:
+                logger.critical('Could not place order for %s. Reason: %s', order.getInstrument(), e)
+                raise
 
-            logger.info(
-                f'Placed {priceType} {"Buy" if order.isBuy() else "Sell"} Order {oldOrderId} New order {order.getId()} at {order.getSubmitDateTime()}')            
-        except Exception as e:
-            logger.critical(f'Could not place order for {symbol}. Reason: {e}')
+    def placeOrders(self, orders: List[Order]):
+        # Every order is attempted, the ones that could not be placed are returned as (order, exception)
+        failed = []
 
-    def submitOrder(self, order: Order):
-        if order.isInitial():
+        if len(orders) == 1:
+            try:
+                self.placeOrder(orders[0])
+            except Exception as e:
+                failed.append((orders[0], e))
+            return failed
+
+        # All buys are placed, and waited on, before any sell so hedges are in place before the margin heavy sells
+        batchSize = LiveBroker.ORDER_BATCH_SIZE
+        buys = [order for order in orders if order.isBuy()]
+        sells = [order for order in orders if not order.isBuy()]
+        batches = [group[start:start + batchSize] for group in (buys, sells) for start in range(0, len(group), batchSize)]
+
+        with ThreadPoolExecutor(max_workers=batchSize) as executor:
+            # Orders sent since the last pause, at most ORDER_BATCH_SIZE go out per ORDER_BATCH_INTERVAL
+            sentSincePause = 0
+            for batch in batches:
+                if sentSincePause + len(batch) > batchSize:
+                    time.sleep(LiveBroker.ORDER_BATCH_INTERVAL)
+                    sentSincePause = 0
+                futures = [executor.submit(self.placeOrder, order) for order in batch]
+                for order, future in zip(batch, futures):
+                    e = future.exception()
+                    if e is not None:
+                        failed.append((order, e))
+                sentSincePause += len(batch)
+        return failed
+
+    def submitOrders(self, orders: List[Order], raiseOnFailure=False):
+        for order in orders:
+            if not order.isInitial():
+                raise Exception("The order was already processed")
+
+        for order in orders:
             # Override user settings based on Finvasia limitations.
             order.setAllOrNone(False)
             order.setGoodTillCanceled(True)
 
-            self.placeOrder(order)
+        # Placed orders are switched to SUBMITTED by _markSubmitted. Orders that could not be placed are canceled
+        # through dispatch, or with raiseOnFailure stay INITIAL so the caller can submit them again.
+        failed = self.placeOrders(orders)
+        if not failed:
+            return
 
-            # Switch from INITIAL -> SUBMITTED
-            # IMPORTANT: Do not emit an event for this switch because when using the position interface
-            # the order is not yet mapped to the position and Position.onOrderUpdated will get called.
-            order.switchState(broker.Order.State.SUBMITTED)
-        else:
-            raise Exception("The order was already processed")
+        if raiseOnFailure:
+            _, e = failed[0]
+            raise Exception(f'Could not place {len(failed)} of {len(orders)} order/s. Reason: {e}') from e
+
+        for order, e in failed:
+            self._markFailed(order, str(e))
+
+    def submitOrder(self, order: Order):
+        self.submitOrders([order])
 
     def _createOrder(self, orderType, action, instrument, quantity, price, stopPrice):
-        action = {
-            broker.Order.Action.BUY_TO_COVER: broker.Order.Action.BUY,
-            broker.Order.Action.BUY:          broker.Order.Action.BUY,
-            broker.Order.Action.SELL_SHORT:   broker.Order.Action.SELL,
-            broker.Order.Action.SELL:         broker.Order.Action.SELL
-        }.get(action, None)
+        action = actionMapping.get(action, None)
 
         if action is None:
             raise Exception("Only BUY/SELL orders are supported")
 
-        if orderType == broker.MarketOrder:
-            return broker.MarketOrder(action, instrument, quantity, False, self.getInstrumentTraits(instrument))
-        elif orderType == broker.LimitOrder:
-            return broker.LimitOrder(action, instrument, price, quantity, self.getInstrumentTraits(instrument))
-        elif orderType == broker.StopOrder:
-            return broker.StopOrder(action, instrument, stopPrice, quantity, self.getInstrumentTraits(instrument))
-        elif orderType == broker.StopLimitOrder:
-            return broker.StopLimitOrder(action, instrument, stopPrice, price, quantity, self.getInstrumentTraits(instrument))
+        builder = orderBuilders.get(orderType)
+        if builder is None:
+            raise Exception(f"Unsupported order type {orderType}")
+
+        return builder(action, instrument, quantity, price, stopPrice, self.getInstrumentTraits(instrument))
 
     def createMarketOrder(self, action, instrument, quantity, onClose=False):
         return self._createOrder(broker.MarketOrder, action, instrument, quantity, None, None)
@@ -934,26 +1129,47 @@ class LiveBroker(broker.Broker):
     def createStopLimitOrder(self, action, instrument, stopPrice, limitPrice, quantity):
         return self._createOrder(broker.StopLimitOrder, action, instrument, quantity, limitPrice, stopPrice)
 
+    def cancelOrders(self, orders: List[Order]):
+        # Every order that is still active and unfilled is cancelled, the rejected ones are returned as
+        # (order, exception). One leg filling during an unwind must not leave the other legs resting.
+        failed = []
+        for order in orders:
+            # Checked under the table lock so a fill being applied by dispatch can't land in between. The order lock
+            # is left to _cancelOrder, it is held across placement round trips and would block the caller.
+            with self.__activeOrders.getLock():
+                activeOrder: Order = self.__activeOrders.get(order.getId())
+                if activeOrder is None:
+                    failed.append((order, Exception("The order is not active anymore")))
+                    continue
+                if activeOrder.isFilled():
+                    failed.append((order, Exception("Can't cancel order that has already been filled")))
+                    continue
+
+            # Shoonya has no batch cancel endpoint, so the cancels are sent concurrently by the cancel executor
+            self.__cancelExecutor.submit(self._cancelOrder, order)
+        return failed
+
     def cancelOrder(self, order: Order):
-        activeOrder: Order = self.__activeOrders.get(order.getId())
-        if activeOrder is None:
-            raise Exception("The order is not active anymore")
-        if activeOrder.isFilled():
-            raise Exception("Can't cancel order that has already been filled")
+        failed = self.cancelOrders([order])
+        if failed:
+            _, e = failed[0]
+            raise e
 
-        try:
-            cancelOrderResponse = self.__api.cancel_order(orderno=order.getId())
+    def _cancelOrder(self, order: Order):
+        with self._getOrderLock(order):
+            try:
+                cancelOrderResponse = self.__api.cancel_order(orderno=order.getId())
 
-            if cancelOrderResponse is None:
-                raise Exception('cancel_order returned None')
+                if cancelOrderResponse is None:
+                    raise Exception('cancel_order returned None')
 
-            orderResponse = OrderResponse(cancelOrderResponse)
+                orderResponse = OrderResponse(cancelOrderResponse)
 
-            if orderResponse.getStat() != "Ok":
-                raise Exception(orderResponse.getErrorMessage())
+                if orderResponse.getStat() != "Ok":
+                    raise Exception(orderResponse.getErrorMessage())
 
-            logger.info(f'Canceled order {orderResponse.getId()} at {orderResponse.getDateTime()}')
-        except Exception as e:
-            logger.critical(f'Could not cancel order for {order.getId()}. Reason: {e}')
+                logger.info(f'Canceled order {orderResponse.getId()} at {orderResponse.getDateTime()}')
+            except Exception as e:
+                logger.critical(f'Could not cancel order for {order.getId()}. Reason: {e}')
 
     # END broker.Broker interface
@@ -7,6 +7,7 @@ import logging
 import traceback
 
 from pyalgotrade import bar
+from pyalgotrade import observer
 from pyalgomate.barfeed import BaseBarFeed
 from pyalgomate.barfeed.BasicBarEx import BasicBarEx
 from pyalgomate.brokers.finvasia.wsclient import WebSocketClient
@@ -128,6 +129,7 @@ class LiveTradeFeed(BaseBarFeed):
             self.registerDataSeries(key)
 
         self.__wsClient: WebSocketClient = None
+        self.__orderUpdateEvent = observer.Event()
         self.__stopped = False
         self.__nextBarsTime = None
         self.__lastUpdateTime = None
@@ -140,7 +142,7 @@ class LiveTradeFeed(BaseBarFeed):
 
     def __initializeClient(self):
         logger.info("Initializing websocket client")
-        self.__wsClient = WebSocketClient(self.__api, self.__channels)
+        self.__wsClient = WebSocketClient(self.__api, self.__channels, self.__orderUpdateEvent.emit)
         self.__wsClient.startClient()
         logger.info("Waiting for websocket initialization to complete")
         initialized = self.__wsClient.waitInitialized(self.__timeout)
@@ -227,6 +229,17 @@ class LiveTradeFeed(BaseBarFeed):
         """
         return None
 
+    def getOrderUpdateEvent(self):
+        """
+        Returns the event that will be emitted when the websocket pushes an order update.
+
+        Event handlers should receive one parameter:
+         1. The order update message as a dict.
+
+        :rtype: :class:`pyalgotrade.observer.Event`.
+        """
+        return self.__orderUpdateEvent
+
     def getLastUpdatedDateTime(self):
         return self.__wsClient.getLastQuoteDateTime()
 
@@ -12,8 +12,9 @@ from NorenRestApiPy.NorenApi import NorenApi
 logger = logging.getLogger(__name__)
 
 class WebSocketClient:
-    def __init__(self, api, tokenMappings):
+    def __init__(self, api, tokenMappings, onOrderUpdate=None):
         assert len(tokenMappings), "Missing subscriptions"
+        self.__onOrderUpdate = onOrderUpdate
         self.__quotes = dict()
         self.__lastQuoteDateTime = None
         self.__lastReceivedDateTime = None
@@ -74,6 +75,9 @@ class WebSocketClient:
         for channel in self.__pending_subscriptions:
             logger.info("Subscribing to channel %s." % channel)
             self.__api.subscribe(channel)
+        if self.__onOrderUpdate is not None:
+            logger.info("Subscribing to order updates.")
+            self.__api.subscribe_orders()
         self.__connectionOpened.set()
 
     def onClosed(self):
@@ -103,4 +107,5 @@ class WebSocketClient:
             self.__quotes[key] = message
 
     def onOrderBookUpdate(self, message):
-        pass
+        if self.__onOrderUpdate is not None:
+            self.__onOrderUpdate(message)
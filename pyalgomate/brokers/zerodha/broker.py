@@ -13,7 +13,7 @@ import pandas as pd
 from .kiteext import KiteExt
 
 from pyalgotrade import broker
-from pyalgomate.brokers import BacktestingBroker, QuantityTraits
+from pyalgomate.brokers import BacktestingBroker, quantityTraits, actionMapping, orderBuilders
 from pyalgomate.strategies import OptionContract
 import pyalgomate.utils as utils
 from pyalgomate.utils import UnderlyingIndex
@@ -407,7 +407,7 @@ class ZerodhaLiveBroker(broker.Broker):
         return self.__api
 
     def getInstrumentTraits(self, instrument):
-        return QuantityTraits()
+        return quantityTraits
 
     def _registerOrder(self, order):
         assert (order.getId() not in self.__activeOrders)
@@ -592,25 +592,16 @@ class ZerodhaLiveBroker(broker.Broker):
             raise Exception("The order was already processed")
 
     def _createOrder(self, orderType, action, instrument, quantity, price, stopPrice):
-        action = {
-            broker.Order.Action.BUY_TO_COVER: broker.Order.Action.BUY,
-            broker.Order.Action.BUY: broker.Order.Action.BUY,
-            broker.Order.Action.SELL_SHORT: broker.Order.Action.SELL,
-            broker.Order.Action.SELL: broker.Order.Action.SELL
-        }.get(action, None)
+        action = actionMapping.get(action, None)
 
         if action is None:
             raise Exception("Only BUY/SELL orders are supported")
 
-        if orderType == broker.MarketOrder:
-            return broker.MarketOrder(action, instrument, quantity, False, self.getInstrumentTraits(instrument))
-        elif orderType == broker.LimitOrder:
-            return broker.LimitOrder(action, instrument, price, quantity, self.getInstrumentTraits(instrument))
-        elif orderType == broker.StopOrder:
-            return broker.StopOrder(action, instrument, stopPrice, quantity, self.getInstrumentTraits(instrument))
-        elif orderType == broker.StopLimitOrder:
-            return broker.StopLimitOrder(action, instrument, stopPrice, price, quantity,
-                                         self.getInstrumentTraits(instrument))
+        builder = orderBuilders.get(orderType)
+        if builder is None:
+            raise Exception(f"Unsupported order type {orderType}")
+
+        return builder(action, instrument, quantity, price, stopPrice, self.getInstrumentTraits(instrument))
 
     def createMarketOrder(self, action, instrument, quantity, onClose=False):
         return self._createOrder(broker.MarketOrder, action, instrument, quantity, None, None)